@@ -1,17 +1,35 @@
 import os
 import json
+import atexit
+import contextlib
+import functools
+import heapq
 import threading
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 import logging
 import shutil
 import platform
+import sys
+import sqlite3
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
 
 if platform.system() == 'Windows':
     import msvcrt
 else:
     import fcntl
 
+try:
+    import orjson
+    # orjson returns bytes directly; keep stdlib's tolerance for non-string dict keys
+    _dumps = functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS)
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    _loads = json.loads
+
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -37,84 +55,180 @@ class InvalidJSONError(DataStoreError):
 class FileSizeLimitExceededError(DataStoreError):
     pass
 
-class LocalDataStore:
-    MAX_FILE_SIZE = 1 * 1024 * 1024 * 1024  # 1GB in bytes
-    MAX_KEY_LENGTH = 32
-    MAX_VALUE_SIZE = 16 * 1024  # 16KB in bytes
-    BATCH_LIMIT = 100  # Maximum number of key-value pairs allowed in a batch operation
-    MAX_DATA_CAPACITY = int(MAX_FILE_SIZE * 0.9)  # Max capacity for self.data (90% of file limit)
-    WARNING_THRESHOLD = 0.90  # 90% capacity usage
-    CRITICAL_THRESHOLD = 0.98  # 98% capacity usage
+class FileLockError(DataStoreError):
+    pass
 
-    def __init__(self, file_path: Optional[str] = None, monitor_interval: int = 60):
-        # Initialize the data store with an optional file path
-        default_path = os.path.join(os.path.expanduser('~'), 'Documents', 'data_store.json')
-        self.file_path = file_path or default_path
-        self.lock = threading.Lock()  # Thread lock for critical section
-        self.data = {}
-        self.load_data()
-        self.monitor_interval = monitor_interval
-        self.start_monitoring()
-        self.file_lock = None
+class FileLock:
+    """Exclusive OS lock on a store's data file, held through a sidecar '<file>.lock' file."""
 
-    def acquire_file_lock(self):
-        """Acquire a file lock to prevent concurrent access"""
-        try:
-            self.file_lock = open(self.file_path, 'a+')  # Open the file in append mode
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        # Lock a sidecar file: the snapshot itself is swapped out by os.replace on every save
+        self.lock_path = file_path + '.lock'
+        self.handle = None
 
+    def acquire(self):
+        # Errors opening the sidecar (missing directory, permissions) propagate as they are
+        self.handle = open(self.lock_path, 'a+')
+        try:
             if platform.system() == 'Windows':
-                # For Windows, use msvcrt for file locking
-                msvcrt.locking(self.file_lock.fileno(), msvcrt.LK_NBLCK, os.fstat(self.file_lock.fileno()).st_size)
+                # For Windows, use msvcrt for file locking; LK_NBLCK fails at once if another process holds it
+                try:
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_NBLCK, 1)
+                except OSError as e:
+                    raise BlockingIOError(*e.args) from e
             else:
-                # For Unix-based systems, use fcntl for file locking
-                fcntl.flock(self.file_lock, fcntl.LOCK_EX)  # Lock the file
+                # For Unix-based systems, use fcntl for file locking; LOCK_NB raises BlockingIOError on contention
+                fcntl.flock(self.handle, fcntl.LOCK_EX | fcntl.LOCK_NB)  # Lock the file
 
+        except BlockingIOError as e:
+            self.handle.close()
+            self.handle = None
+            logging.error(f"Error acquiring file lock: {e}")
+            raise FileLockError(f"Error: The data file at {self.file_path} is already in use by another store.") from e
         except Exception as e:
+            self.handle.close()
+            self.handle = None
             logging.error(f"Error acquiring file lock: {e}")
             raise
 
-    
-    def release_file_lock(self):
-        """Release the file lock after finishing file operations"""
+    def release(self):
         try:
-            if self.file_lock:
+            if self.handle:
                 if platform.system() == 'Windows':
                     # For Windows, unlock using msvcrt
                     logging.info("Attempting to release file lock.")
-                    msvcrt.locking(self.file_lock.fileno(), msvcrt.LK_UNLCK, os.fstat(self.file_lock.fileno()).st_size)
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
                 else:
                     # For Unix-based systems, unlock using fcntl
                     logging.info("Attempting to release file lock.")
-                    fcntl.flock(self.file_lock, fcntl.LOCK_UN)  # Unlock the file
+                    fcntl.flock(self.handle, fcntl.LOCK_UN)  # Unlock the file
                 logging.info("File lock released successfully.")
-                self.file_lock.close()  # Close the file explicitly
+                self.handle.close()  # Close the file explicitly
+                self.handle = None
 
         except Exception as e:
             logging.error(f"Error releasing file lock: {e}")
-            raise 
+            raise
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+class NullLock:
+    """Lock strategy that takes no OS lock, for stores whose file is never shared (e.g. in tests)."""
+
+    def acquire(self):
+        pass
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+class LocalDataStore:
+    MAX_FILE_SIZE = 1 * 1024 * 1024 * 1024  # 1GB in bytes
+    MAX_KEY_LENGTH = 32
+    MAX_VALUE_SIZE = 16 * 1024  # 16KB in bytes
+    BATCH_LIMIT = 100  # Maximum number of key-value pairs allowed in a batch operation
+    MAX_DATA_CAPACITY = int(MAX_FILE_SIZE * 0.9)  # Max capacity for self.data (90% of file limit)
+    WARNING_THRESHOLD = 0.90  # 90% capacity usage
+    CRITICAL_THRESHOLD = 0.98  # 98% capacity usage
+    COMPACT_THRESHOLD = 1000  # WAL records written before the snapshot is rewritten
+    SNAPSHOT_BUFFER_SIZE = 1 << 20  # 1MB write buffer for snapshot rewrites
+    ENTRY_OVERHEAD = len(b'{"value":,"expiry":}') + 2  # Entry delimiters plus the ':' and ',' around it
+    LOCK_STRIPES = 64  # Per-key locks; keys hash onto one of these stripes
+    CLEANUP_COOLDOWN = 300  # Minimum seconds between cleanups triggered by the monitor
+    NS_PER_SECOND = 1_000_000_000  # Expiries are integer nanoseconds, so TTL checks are plain int compares
+    MAX_EXPIRY_NS = 2 ** 63 - 1  # Largest expiry orjson and SQLite INTEGER can store
+    HEAP_SLACK = 64  # Stale expiry heap entries tolerated beyond twice the live TTL keys before a rebuild
+
+    def __init__(self, file_path: Optional[str] = None, monitor_interval: int = 60, durable: bool = False,
+                 lock_strategy=None, clock=time.time_ns):
+        # Initialize the data store with an optional file path
+        default_path = os.path.join(os.path.expanduser('~'), 'Documents', 'data_store.json')
+        self.file_path = file_path or default_path
+        self.wal_path = self.file_path + '.wal'  # Append-only log of mutations since the last snapshot
+        self.rotated_wal_path = self.wal_path + '.1'  # Log being folded into the snapshot by a background save
+        self._dir_path = os.path.dirname(os.path.abspath(self.file_path))  # Resolved once; fsynced after each rename
+        self.durable = durable  # fsync every WAL record when True
+        self._now = clock  # Current time in integer nanoseconds since the epoch; used for every TTL decision
+        self.lock = threading.Lock()  # Guards data/expiry mutations, the WAL, the size counter and the expiry heap
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]  # Serialize operations on the same key
+        self.lock_strategy = lock_strategy or FileLock(self.file_path)  # Guards the data file against other stores
+        self.data = {}  # key -> value encoded as JSON bytes; decoded on read, spliced as-is into WAL and snapshot
+        self._expiry = {}  # key -> expiry in integer nanoseconds since the epoch, only for keys created with a TTL
+        self._wal = None
+        self._wal_records = 0
+        self._io_exec = None  # Writes periodic snapshots off the caller's thread; started by the first one
+        self._pending_save = None
+        self._has_rotated_wal = False  # Tracked in memory so saves need no stat() call to find the rotated log
+        # Staging buffer reused by every snapshot write; only one snapshot is ever written at a time.
+        # Allocated by the first write, so stores that never write a snapshot never pay for it.
+        self._snapshot_buf = None
+        self._closed = False
+        # Set by the write path once usage crosses WARNING_THRESHOLD; wakes the monitor thread
+        self._pressure_event = threading.Event()
+        self._warning_bytes = self.WARNING_THRESHOLD * self.MAX_DATA_CAPACITY
+        self.acquire_file_lock()  # Held for the lifetime of the store; released by close()
+        try:
+            self.load_data()
+            # Serialized snapshot size in bytes, kept up to date by every mutation so capacity checks are O(1)
+            self.total_size = sum(map(len, self._snapshot_chunks(self.data, self._expiry)))
+            # Min-heap of (expiry, key); entries for keys deleted or re-created since are skipped on pop
+            self._expiry_heap = [(expiry, key) for key, expiry in self._expiry.items()]
+            heapq.heapify(self._expiry_heap)
+            self._wal = self._open_wal()
+        except BaseException:
+            # The store is unusable; let the caller retry (e.g. after InvalidJSONError reset the file)
+            self.release_file_lock()
+            raise
+        self.monitor_interval = monitor_interval  # Minimum seconds between capacity checks
+        self._last_cleanup_ts = 0.0
+        if self.total_size > self._warning_bytes:
+            self._pressure_event.set()
+        self.start_monitoring()
+        atexit.register(self.close)  # Compact stores the caller never closed; unregistered by close()
+
+    def acquire_file_lock(self):
+        """Take exclusive ownership of the data file so no other process opens the same store."""
+        self.lock_strategy.acquire()
+
+    def release_file_lock(self):
+        """Release ownership of the data file."""
+        self.lock_strategy.release()
+
     def __enter__(self):
         """Enter the runtime context related to this object."""
-        self.acquire_file_lock()
         return self
 
-    def _exit_(self, exc_type, exc_val, exc_tb):
-        """Context manager exit to release the file lock."""
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit to persist the store and release the file lock."""
         if exc_type is not None:
             logging.error("An exception occurred: %s", exc_val)
             logging.debug("Traceback details:", exc_info=(exc_type, exc_val, exc_tb))
-        self.release_file_lock()
+        self.close()
 
     def load_data(self):
-        """Load data from the specified file path."""
+        """Load the snapshot from the specified file path and replay the WAL on top of it."""
         logging.info("Loading data from %s", self.file_path)
         try:
-            with open(self.file_path, 'r') as f:
-                self.data = json.load(f)
+            with open(self.file_path, 'rb') as f:
+                snapshot = _loads(f.read())
                 logging.info("Data loaded successfully.")
         except FileNotFoundError:
             logging.warning("Data file not found, creating a new empty data store.")
-            self.data = {}
-            self.save_data()  # Initialize with an empty file
+            self.data, self._expiry = {}, {}
+            self.replay_wal()
+            self._save()  # Initialize with an empty file
+            return
         except PermissionError:
             logging.error("Permission denied for file %s. Please check file permissions.", self.file_path)
             raise DataStoreError(f"Permission denied for file {self.file_path}.")
@@ -123,48 +237,336 @@ class LocalDataStore:
             logging.error("Invalid JSON in data file. Creating a backup and initializing an empty data store.")
             shutil.move(self.file_path, backup_path)
             logging.info("Backup created at %s", backup_path)
-            self.data = {}
-            self.save_data()
+            # The logs hold the newest mutations and the reset below empties them, so keep copies next to the snapshot.
+            # A rotated log left in place would also be replayed into the reset store on the next open.
+            log_backups = [path for path in map(self._move_to_backup, (self.rotated_wal_path, self.wal_path)) if path]
+            self._has_rotated_wal = False
+            self.data, self._expiry = {}, {}
+            self._save()
+            logs = f" The write-ahead log has been backed up to {', '.join(log_backups)}." if log_backups else ""
             raise InvalidJSONError(
-                f"Error: The data file at {self.file_path} contains invalid JSON. A backup has been created at {backup_path}. "
+                f"Error: The data file at {self.file_path} contains invalid JSON. A backup has been created at {backup_path}.{logs} "
                 "The data store has been reset. Please check the backup file for errors or reinitialize with a valid JSON file."
             )
+        # The file keeps one {"value", "expiry"} object per key; split it into the in-memory columns
+        # Keys are interned so every map shares one string object per key instead of a fresh copy each
+        intern = sys.intern
+        self.data = {intern(key): _dumps(entry["value"]) for key, entry in snapshot.items()}
+        as_ns = self._as_ns
+        self._expiry = {intern(key): as_ns(entry["expiry"]) for key, entry in snapshot.items() if entry["expiry"] is not None}
+        self.replay_wal()
+
+    @staticmethod
+    def _move_to_backup(path: str) -> Optional[str]:
+        """Move a file aside to '<path>.backup', returning the backup path, or None if there was no file."""
+        backup_path = f"{path}.backup"
+        try:
+            os.replace(path, backup_path)
+        except FileNotFoundError:
+            return None
+        logging.info("Backup created at %s", backup_path)
+        return backup_path
+
+    def replay_wal(self):
+        """Apply the mutations recorded in the WAL since the last snapshot."""
+        # A log left behind by an unfinished background save is older than the live one. Replaying it over a
+        # snapshot that already includes it is harmless: each key ends at the same last put or delete.
+        self._has_rotated_wal = self._replay_file(self.rotated_wal_path)
+        self._replay_file(self.wal_path)
+        logging.info("Replayed %d WAL records.", self._wal_records)
+
+    def _replay_file(self, wal_path: str) -> bool:
+        """Apply the records of one log file to memory, returning whether the file existed."""
+        good_bytes = 0  # Length of the prefix made of complete records
+        torn = corrupt = False
+        try:
+            with open(wal_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Only the final line can lack its terminator: a crash mid-append tore it
+                        logging.warning("Ignoring truncated record at the end of %s", wal_path)
+                        torn = True
+                        break
+                    try:
+                        record = _loads(line)
+                    except json.JSONDecodeError:
+                        corrupt = True  # A complete line that does not decode; the records after it may be fine
+                        break
+                    key = sys.intern(record["k"])
+                    if record["op"] == "put":
+                        self.data[key] = _dumps(record["v"])
+                        if record["exp"] is not None:
+                            self._expiry[key] = self._as_ns(record["exp"])
+                        else:
+                            self._expiry.pop(key, None)
+                    elif record["op"] == "del":
+                        self.data.pop(key, None)
+                        self._expiry.pop(key, None)
+                    self._wal_records += 1
+                    good_bytes += len(line)
+        except FileNotFoundError:
+            return False
+        if corrupt:
+            backup_path = f"{wal_path}.backup"
+            logging.error("Invalid record in %s. Backing it up and keeping only the records before it.", wal_path)
+            shutil.copyfile(wal_path, backup_path)
+            os.truncate(wal_path, good_bytes)
+            logging.info("Backup created at %s", backup_path)
+            raise InvalidJSONError(
+                f"Error: The log at {wal_path} contains an invalid record at byte {good_bytes}. A backup has been created at {backup_path}. "
+                "The log has been cut back to the records before it. Please check the backup file for the records that followed."
+            )
+        if torn:
+            # Cut the torn bytes off, or the next append would be glued onto them and lost on the next replay
+            os.truncate(wal_path, good_bytes)
+        return True
+
+    def _open_wal(self):
+        """Open the log that mutation records are appended to."""
+        # Unbuffered: each append_wal is a single write straight to the OS, with nothing held back in userspace
+        return open(self.wal_path, 'ab', buffering=0)
+
+    def append_wal(self, *records: bytes):
+        """Append encoded mutation records to the WAL in a single write, compacting once it grows too long."""
+        self._write_all(self._wal, b"\n".join(records) + b"\n")
+        if self.durable:
+            os.fsync(self._wal.fileno())
+        self._wal_records += len(records)
+        if self._wal_records >= self.COMPACT_THRESHOLD:
+            try:
+                self._compact_in_background()
+            except OSError as e:
+                # The records are already in memory and the WAL, so the mutation stands; retry at the next threshold
+                logging.error(f"Error starting WAL compaction, will retry: {e}")
+                self._wal_records = 0
 
     def save_data(self):
-        """Save data to the specified file path, with file locking for safe access."""
-        self.acquire_file_lock()
+        """
+        Compact the WAL into the snapshot. Safe to call while other threads write: self.lock is held only to
+        rotate the log and copy the maps, while the snapshot is written and fsynced on the I/O thread.
+        """
+        while True:
+            with self.lock:
+                pending = self._pending_save
+                if pending is None or pending.done():
+                    self._pending_save = None
+                    self._compact_in_background()
+                    pending = self._pending_save
+                    break
+            # A background save is in flight; wait for it without blocking writers, then rotate again
+            futures_wait([pending])
+        if pending is not None:
+            pending.result()  # Re-raise a failed write in the caller
+
+    def _save(self):
+        """Compact the WAL into the snapshot on the calling thread. Caller holds self.lock or owns the store alone."""
         try:
-            with open(self.file_path, 'w') as f:
-                json.dump(self.data, f)
-                f.truncate()
+            self._compact()
             logging.info("Data saved successfully.")
         except Exception as e:
             logging.error(f"Error saving data: {e}")
             raise
+
+    def _compact(self):
+        """Atomically rewrite the snapshot from memory and truncate the WAL."""
+        self._wait_for_save()
+        self._write_snapshot(self.data, self._expiry)
+        if self._wal is not None:
+            self._wal.truncate(0)
+        else:
+            open(self.wal_path, 'wb').close()
+        self._wal_records = 0
+
+    def _compact_in_background(self):
+        """Rotate the WAL and hand a copy of the current state to the I/O thread. Caller holds self.lock."""
+        if self._pending_save is not None and not self._pending_save.done():
+            return  # Coalesce: the running save will be followed by another once the new log fills up
+        if self._has_rotated_wal:
+            # The previous background save failed; fold everything in synchronously instead
+            self._save()
+            return
+        self._wal.close()
+        try:
+            os.replace(self.wal_path, self.rotated_wal_path)
+            self._has_rotated_wal = True
         finally:
+            # Keep logging to the live path even if the rotation failed
+            self._wal = self._open_wal()
+        self._wal_records = 0
+        # Shallow copies only copy references, so the caller's lock is held for a pointer copy, not an encode
+        if self._io_exec is None:
+            self._io_exec = ThreadPoolExecutor(max_workers=1)
+        self._pending_save = self._io_exec.submit(self._background_save, dict(self.data), dict(self._expiry))
+
+    def _background_save(self, blobs: Dict[str, bytes], expiry: Dict[str, int]):
+        """Write a snapshot on the I/O thread, logging failures; save_data re-raises them through the future."""
+        try:
+            self._write_snapshot(blobs, expiry)
+            logging.info("Data saved successfully.")
+        except Exception as e:
+            logging.error(f"Error saving data in the background: {e}")
+            raise
+
+    def _wait_for_save(self):
+        """Block until any background save has finished, successfully or not."""
+        if self._pending_save is not None:
+            futures_wait([self._pending_save])
+            self._pending_save = None
+
+    def _write_snapshot(self, blobs: Dict[str, bytes], expiry: Dict[str, int]):
+        """Atomically replace the snapshot file and drop any rotated log it now covers."""
+        tmp_path = self.file_path + '.tmp'
+        try:
+            # Unbuffered: chunks are staged in the pooled buffer instead of a fresh 1MB allocation per save
+            with open(tmp_path, 'wb', buffering=0) as f:
+                self._write_chunks(f, self._snapshot_chunks(blobs, expiry))
+                # The snapshot must be on disk before the WAL records it replaces are truncated
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        if platform.system() != 'Windows':
+            # Persist the rename itself; Windows cannot open directories for fsync
+            dir_fd = os.open(self._dir_path, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        if self._has_rotated_wal:
+            try:
+                os.remove(self.rotated_wal_path)
+            except FileNotFoundError:
+                pass
+            self._has_rotated_wal = False
+
+    def _write_chunks(self, f, chunks):
+        """Coalesce many small chunks into few large writes through the pooled snapshot buffer."""
+        if self._snapshot_buf is None:
+            self._snapshot_buf = bytearray(self.SNAPSHOT_BUFFER_SIZE)
+        view = memoryview(self._snapshot_buf)
+        capacity = len(view)
+        used = 0
+        for chunk in chunks:
+            size = len(chunk)
+            if used + size > capacity:
+                self._write_all(f, view[:used])
+                used = 0
+                if size > capacity:
+                    self._write_all(f, chunk)
+                    continue
+            view[used:used + size] = chunk
+            used += size
+        self._write_all(f, view[:used])
+
+    @staticmethod
+    def _write_all(f, data):
+        """Write to an unbuffered file, retrying the remainder after a short write."""
+        view = memoryview(data)
+        while view:
+            view = view[f.write(view):]
+
+    @staticmethod
+    def _snapshot_chunks(blobs: Dict[str, bytes], expiry: Dict[str, int]):
+        """Yield the on-disk {key: {"value": ..., "expiry": ...}} layout, splicing in the cached value encodings."""
+        yield b"{"
+        separator = b""
+        for key, blob in blobs.items():
+            yield b"%s%s:{\"value\":%s,\"expiry\":%s}" % (separator, _dumps(key), blob, _dumps(expiry.get(key)))
+            separator = b","
+        yield b"}"
+
+    @classmethod
+    def _as_ns(cls, expiry) -> int:
+        """Normalize a stored expiry to integer nanoseconds; files written before the switch hold float seconds."""
+        return round(expiry * cls.NS_PER_SECOND) if isinstance(expiry, float) else expiry
+
+    @staticmethod
+    def _put_record(key: str, blob: bytes, expiry: Optional[int]) -> bytes:
+        """Encode a WAL put record around an already-encoded value."""
+        return b'{"op":"put","k":%s,"v":%s,"exp":%s}' % (_dumps(key), blob, _dumps(expiry))
+
+    @staticmethod
+    def _del_record(key: str) -> bytes:
+        """Encode a WAL delete record."""
+        return _dumps({"op": "del", "k": key})
+
+    def close(self):
+        """Fold the WAL into the snapshot, close the log file and release the file lock."""
+        with self.lock:
+            if self._closed:
+                return
+            atexit.unregister(self.close)
+            self._save()
+            self._wal.close()
+            if self._io_exec is not None:
+                self._io_exec.shutdown()
             self.release_file_lock()
+            self._closed = True
+            self._pressure_event.set()  # Let the monitor thread exit
+
+    def _stripe_index(self, key: str) -> int:
+        """Map a key onto one of the stripe locks."""
+        return hash(key) % self.LOCK_STRIPES
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        """Return the stripe lock that serializes operations on this key."""
+        return self._stripes[self._stripe_index(key)]
+
+    @contextlib.contextmanager
+    def _hold_stripes(self, indices):
+        """Hold several stripe locks, always taken in index order so concurrent callers cannot deadlock."""
+        held = [self._stripes[i] for i in sorted(indices)]
+        for stripe in held:
+            stripe.acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(held):
+                stripe.release()
+
+    def _entry_size(self, key: str, value_size: int, expiry: Optional[int]) -> int:
+        """Bytes a single entry contributes to the serialized snapshot, separators included."""
+        return len(_dumps(key)) + value_size + len(_dumps(expiry)) + self.ENTRY_OVERHEAD
+
+    def _discard(self, key: str) -> bool:
+        """Remove a key from memory and deduct its share of the serialized size. Caller holds self.lock."""
+        blob = self.data.pop(key, None)
+        if blob is None:
+            return False
+        expiry = self._expiry.pop(key, None)
+        self.total_size -= self._entry_size(key, len(blob), expiry)
+        return True
 
     def check_capacity_usage(self) -> float:
         """Calculate the current data capacity usage as a percentage."""
-        current_size = len(json.dumps(self.data).encode('utf-8'))
-        return current_size / self.MAX_DATA_CAPACITY
+        return self.total_size / self.MAX_DATA_CAPACITY
 
     def handle_critical_threshold(self):
         """Handle actions like cleanup or alerting when capacity exceeds the critical threshold."""
         logging.info("Handling critical threshold. Taking actions such as cleanup or alerting.")
+        self._last_cleanup_ts = time.time()
         self.cleanup_expired_keys()
 
     def start_monitoring(self):
-        """Start the background monitoring thread."""
+        """Start the background monitoring thread, which sleeps until the write path reports pressure."""
         def monitor():
             while True:
-                with self.lock: #if you are using macOS use self.file_lock
-                    usage_percentage = self.check_capacity_usage()
-                    if usage_percentage > self.CRITICAL_THRESHOLD:
-                       logging.warning("Critical alert: Data store is over 98% capacity.")       
-                       self.handle_critical_threshold()
-                    elif usage_percentage > self.WARNING_THRESHOLD:
-                       logging.warning("Warning: Data store is over 90% capacity.")
+                self._pressure_event.wait()
+                if self._closed:
+                    return
+                self._pressure_event.clear()
+                # Reading the running byte count is atomic, so no lock is needed to sample it
+                usage_percentage = self.check_capacity_usage()
+                if usage_percentage > self.CRITICAL_THRESHOLD:
+                    logging.warning("Critical alert: Data store is over 98% capacity.")
+                    if time.time() - self._last_cleanup_ts >= self.CLEANUP_COOLDOWN:
+                        self.handle_critical_threshold()
+                elif usage_percentage > self.WARNING_THRESHOLD:
+                    logging.warning("Warning: Data store is over 90% capacity.")
                 time.sleep(self.monitor_interval)
 
         monitoring_thread = threading.Thread(target=monitor, daemon=True)
@@ -172,38 +574,121 @@ class LocalDataStore:
 
     def enforce_file_size_limit(self):
         """Manage data capacity and clear expired keys if file size exceeds threshold."""
-        current_size = len(json.dumps(self.data).encode('utf-8'))
-
-        if current_size >= self.MAX_DATA_CAPACITY:
+        if self.total_size >= self.MAX_DATA_CAPACITY:
             logging.info("Data capacity nearing limit. Cleaning up expired keys.")
             self.cleanup_expired_keys()
 
             # Re-check size after cleanup
-            current_size = len(json.dumps(self.data).encode('utf-8'))
-            if current_size >= self.MAX_DATA_CAPACITY:
+            if self.total_size >= self.MAX_DATA_CAPACITY:
                 logging.error("Data store has exceeded the capacity limit after cleanup.")
                 raise FileSizeLimitExceededError("Error: Data store capacity exceeded. Delete some entries to free up space.")
 
     def create(self, key: str, value: Dict, ttl: Optional[int] = None):
         """Create a new key-value pair in the data store with an optional TTL."""  
-        with self.lock:
+        self.enforce_file_size_limit()  # O(1) unless the store is full; may clean up, so runs before taking a stripe
+        key = sys.intern(key)
+        with self._lock_for(key):
             if key in self.data:
                 raise KeyExistsError(f"Error: The key '{key}' already exists in the data store.")
-            if len(key) > self.MAX_KEY_LENGTH:
-                raise KeyTooLongError(f"Error: The key length exceeds the maximum limit of {self.MAX_KEY_LENGTH} characters.")
-            if len(json.dumps(value)) > self.MAX_VALUE_SIZE:
-                raise ValueTooLargeError(f"Error: The value size exceeds the maximum limit of {self.MAX_VALUE_SIZE} bytes.")
-            expiry = time.time() + ttl if ttl else None
-            self.data[key] = {"value": value, "expiry": expiry}
+            blob = self._validate(key, value)
+            expiry = self._expiry_for(ttl)
+            with self.lock:
+                self.append_wal(self._insert(key, blob, expiry))
             logging.info(f"Created new key: {key}")
-            self.save_data()
 
         return True
 
+    def _validate(self, key: str, value: Dict) -> bytes:
+        """Check the key and value against the size limits and return the encoded value."""
+        if len(key) > self.MAX_KEY_LENGTH:
+            raise KeyTooLongError(f"Error: The key length exceeds the maximum limit of {self.MAX_KEY_LENGTH} characters.")
+        # Every character encodes to at least one byte, so oversized strings are rejected without encoding them
+        if isinstance(value, str):
+            lower_bound = len(value)
+        elif isinstance(value, dict):
+            lower_bound = sum(len(v) for v in value.values() if isinstance(v, str))
+        else:
+            lower_bound = 0
+        blob = None if lower_bound > self.MAX_VALUE_SIZE else _dumps(value)
+        if blob is None or len(blob) > self.MAX_VALUE_SIZE:
+            raise ValueTooLargeError(f"Error: The value size exceeds the maximum limit of {self.MAX_VALUE_SIZE} bytes.")
+        return blob
+
+    def _expiry_for(self, ttl: Optional[float]) -> Optional[int]:
+        """Turn a TTL in seconds into an absolute expiry in nanoseconds, rejecting ones that cannot be stored."""
+        if not ttl:
+            return None
+        try:
+            expiry = self._now() + round(ttl * self.NS_PER_SECOND)
+        except (OverflowError, ValueError):  # inf or nan
+            expiry = None
+        if expiry is None or not 0 <= expiry <= self.MAX_EXPIRY_NS:
+            raise DataStoreError(f"Error: The TTL {ttl!r} is out of range; expiries must fit in a signed 64-bit nanosecond count.")
+        return expiry
+
+    def _insert(self, key: str, blob: bytes, expiry: Optional[int]) -> bytes:
+        """Store a validated entry and return its WAL record. Caller holds the key's stripe and self.lock."""
+        # Encode first so a failure leaves the maps untouched
+        record = self._put_record(key, blob, expiry)
+        size = self._entry_size(key, len(blob), expiry)
+        if expiry is not None:
+            self._expiry[key] = expiry  # Set before the value so lock-free readers never miss it
+        self.data[key] = blob
+        self._grow(size)
+        if expiry is not None:
+            self._track_expiries([(expiry, key)])
+        return record
+
+    def _insert_many(self, entries: Dict[str, bytes], expiry: Optional[int]) -> List[bytes]:
+        """Store validated entries sharing one expiry and return their WAL records. Caller holds their stripes and self.lock."""
+        # Encode first so a failure leaves the maps untouched
+        entry_size, put_record = self._entry_size, self._put_record
+        records = [put_record(key, blob, expiry) for key, blob in entries.items()]
+        size = sum(entry_size(key, len(blob), expiry) for key, blob in entries.items())
+        if expiry is not None:
+            self._expiry.update(dict.fromkeys(entries, expiry))
+        self.data.update(entries)
+        self._grow(size)
+        if expiry is not None:
+            self._track_expiries([(expiry, key) for key in entries])
+        return records
+
+    def _grow(self, size: int):
+        """Add to the serialized size and wake the monitor once past the warning threshold. Caller holds self.lock."""
+        self.total_size += size
+        if self.total_size > self._warning_bytes and not self._pressure_event.is_set():
+            self._pressure_event.set()
+
+    def _track_expiries(self, pairs):
+        """Push (expiry, key) pairs onto the expiry heap. Caller holds self.lock."""
+        heap, push = self._expiry_heap, heapq.heappush
+        for pair in pairs:
+            push(heap, pair)
+        if len(heap) > 2 * len(self._expiry) + self.HEAP_SLACK:
+            # Deletes and re-creates leave stale entries behind; rebuild once they outnumber the live ones
+            heap[:] = [(expiry, key) for key, expiry in self._expiry.items()]
+            heapq.heapify(heap)
+
     def read(self, key: str) -> Dict[str, Any]:
         """Retrieve the JSON value corresponding to a key and differentiate expired keys."""
-        with self.lock:
-            if key not in self.data or self.is_key_expired(key):
+        # Fast path without locking: a single dict lookup is atomic, and live entries are never modified in place
+        blob = self.data.get(key)
+        if blob is None:
+            return {
+                "status": "error",
+                "message": f"Key '{key}' not found."
+            }
+        expiry = self._expiry.get(key)
+        if expiry is None or expiry >= self._now():
+            return {
+                "status": "success",
+                "value": _loads(blob)
+            }
+
+        # Expired: take the key's lock to evict it
+        with self._lock_for(key):
+            blob = None if self.is_expired(key) else self.data.get(key)
+            if blob is None:
                 return {
                     "status": "error",
                     "message": f"Key '{key}' not found."
@@ -211,30 +696,31 @@ class LocalDataStore:
             else:
                 return {
                     "status": "success",
-                    "value": self.data[key]['value']
+                    "value": _loads(blob)
                 }
 
     def delete(self, key: str):
         """Delete a key-value pair."""
-        with self.lock:
-            if key not in self.data or self.is_key_expired(key):
+        with self._lock_for(key):
+            if self.is_key_expired(key):
                 raise KeyNotFoundError(f"Error: Key '{key}' not found.")
-            del self.data[key]
-        self.save_data()
+            with self.lock:
+                if not self._discard(key):
+                    raise KeyNotFoundError(f"Error: Key '{key}' not found.")
+                self.append_wal(self._del_record(key))
         return f"Key '{key}' deleted successfully."
 
     def is_key_expired(self, key: str) -> bool:
         """Check if a key has expired, without deleting it."""
-        item = self.data.get(key)
-        if not item or item["expiry"] is None:
-            return False
-        return item["expiry"] < time.time()
+        expiry = self._expiry.get(key)
+        return expiry is not None and expiry < self._now()
 
     def is_expired(self, key: str) -> bool:
-        """Check if a key has expired and delete it if so."""
+        """Check if a key has expired and evict it from memory if so."""
         if self.is_key_expired(key):
-            del self.data[key]
-            self.save_data()
+            # Not persisted: the stored expiry still marks the key as expired after a reload
+            with self.lock:
+                self._discard(key)
             return True
         return False
 
@@ -243,14 +729,26 @@ class LocalDataStore:
         Removes keys that have expired. Ensures thread-safety by locking the shared resource.
         """
         with self.lock:
-            current_time = time.time()
-            expired_keys = [key for key, data in self.data.items() if data["expiry"] and data["expiry"] < current_time]
-            
-            for key in expired_keys:
-                del self.data[key]
+            current_time = self._now()
+            heap = self._expiry_heap
+            due = []
+            while heap and heap[0][0] < current_time:
+                due.append(heapq.heappop(heap))
+        if not due:
+            return
+
+        # Lock only the stripes of the keys being evicted, so the rest of the store stays available
+        records = []
+        with self._hold_stripes({self._stripe_index(key) for _, key in due}), self.lock:
+            for expiry, key in due:
+                if self._expiry.get(key) != expiry:
+                    continue  # Stale: the key was deleted or re-created after this was pushed
+                self._discard(key)
+                records.append(self._del_record(key))
                 logging.info(f"Cleaned up expired key: {key}")
-            self.save_data()
-    
+            if records:
+                self.append_wal(*records)
+
     def batch_create(self, kv_pairs: Dict[str, Dict], ttl: Optional[int] = None) -> Dict[str, Any]:
         """Create multiple key-value pairs in a single operation and return detailed results."""
         if len(kv_pairs) > self.BATCH_LIMIT:
@@ -264,12 +762,36 @@ class LocalDataStore:
             "errors": {}     # To store any errors for individual keys
         }
 
+        try:
+            self.enforce_file_size_limit()
+        except FileSizeLimitExceededError as e:
+            results["errors"] = dict.fromkeys(kv_pairs, str(e))
+            kv_pairs = {}
+
+        # Validate everything before touching shared state. Keys already present are reported without encoding
+        # their values; the authoritative existence check is repeated under the locks below.
+        expiry = self._expiry_for(ttl)
+        errors, created, data = results["errors"], results["created"], self.data
+        validate, intern = self._validate, sys.intern
+        valid = {}
         for key, value in kv_pairs.items():
+            if key in data:
+                errors[key] = f"Error: The key '{key}' already exists in the data store."
+                continue
             try:
-                self.create(key, value, ttl)
-                results["created"].append(key)  # Add key to successful creations
+                valid[intern(key)] = validate(key, value)
             except DataStoreError as e:
-                results["errors"][key] = str(e)  # Add error message for the specific key
+                errors[key] = str(e)  # Add error message for the specific key
+
+        # Insert in one bulk update under a single acquisition, then log the whole batch with one write
+        with self._hold_stripes({self._stripe_index(key) for key in valid}), self.lock:
+            for key in [key for key in valid if key in data]:
+                errors[key] = f"Error: The key '{key}' already exists in the data store."
+                del valid[key]
+            if valid:
+                self.append_wal(*self._insert_many(valid, expiry))
+        created.extend(valid)  # Add keys to successful creations
+        logging.info("Batch created %d keys.", len(valid))
 
         # Determine overall status based on the results
         if results["errors"]:
@@ -280,3 +802,81 @@ class LocalDataStore:
             results["message"] = "Batch creation successful."
         return results
 
+class SQLiteDataStore(LocalDataStore):
+    """
+    LocalDataStore persisted to a SQLite database in WAL journal mode instead of a JSON snapshot and log.
+    Every mutation is committed as its own transaction, so there is nothing to compact; memory stays the read cache.
+    """
+    UPSERT_SQL = "INSERT OR REPLACE INTO kv (key, value, expiry) VALUES (?, ?, ?)"
+    DELETE_SQL = "DELETE FROM kv WHERE key = ?"
+
+    def load_data(self):
+        """Open the database, creating the kv table on first use, and load every row into memory."""
+        logging.info("Loading data from %s", self.file_path)
+        try:
+            # Writes are serialized by self.lock, so the connection may be used from any caller thread
+            self.conn = sqlite3.connect(self.file_path, isolation_level=None, check_same_thread=False)
+        except sqlite3.Error as e:
+            raise DataStoreError(f"Error: Unable to open the database at {self.file_path}: {e}") from e
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"PRAGMA synchronous={'FULL' if self.durable else 'NORMAL'}")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, expiry INTEGER)")
+            rows = self.conn.execute("SELECT key, value, expiry FROM kv").fetchall()
+        except sqlite3.Error as e:
+            self.conn.close()
+            raise DataStoreError(f"Error: The file at {self.file_path} is not a usable data store database: {e}") from e
+        intern = sys.intern
+        self.data = {intern(key): value for key, value, _ in rows}
+        self._expiry = {intern(key): expiry for key, _, expiry in rows if expiry is not None}
+        logging.info("Data loaded successfully.")
+
+    def _open_wal(self):
+        # The connection stands in for the log file, so close() releases it the same way
+        return self.conn
+
+    def is_expired(self, key: str) -> bool:
+        """Check if a key has expired and delete it if so; with no snapshot rewrite, the row must go too."""
+        if self.is_key_expired(key):
+            with self.lock:
+                if self._discard(key):
+                    self.append_wal(self._del_record(key))
+            return True
+        return False
+
+    @staticmethod
+    def _put_record(key: str, blob: bytes, expiry: Optional[int]) -> tuple:
+        """Encode a put as the parameters of UPSERT_SQL."""
+        return (key, blob, expiry)
+
+    @staticmethod
+    def _del_record(key: str) -> tuple:
+        """Encode a delete as the parameters of DELETE_SQL."""
+        return (key,)
+
+    def append_wal(self, *records: tuple):
+        """Apply mutation records in a single transaction. Caller holds self.lock."""
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            # Consecutive puts (3 parameters) or deletes (1 parameter) go to the database in one executemany each
+            for arity, group in groupby(records, len):
+                conn.executemany(self.UPSERT_SQL if arity == 3 else self.DELETE_SQL, group)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def save_data(self):
+        """Fold SQLite's write-ahead log back into the database file."""
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        """Checkpoint SQLite's write-ahead log. Caller holds self.lock or owns the store alone."""
+        try:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            logging.info("Data saved successfully.")
+        except Exception as e:
+            logging.error(f"Error saving data: {e}")
+            raise
@@ -1,78 +1,567 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import wait as futures_wait
 from unittest.mock import patch, MagicMock
-from app import *
+from app import (
+    DataStoreError,
+    FileLockError,
+    FileSizeLimitExceededError,
+    InvalidJSONError,
+    LocalDataStore,
+    NullLock,
+    SQLiteDataStore,
+    ValueTooLargeError,
+)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Built once at import rather than on every run of the tests that use them
+_LONG_KEY = "a" * (LocalDataStore.MAX_KEY_LENGTH + 1)
+_LONG_VALUE = "x" * (LocalDataStore.MAX_VALUE_SIZE + 1)
+_ENCODED_TOO_LONG_VALUE = "x" * (LocalDataStore.MAX_VALUE_SIZE - 4)  # Fits as a string, not once wrapped in {"data":...}
+_FITTING_VALUE = "x" * (LocalDataStore.MAX_VALUE_SIZE - 20)
+
+class FakeClock:
+    """Stand-in for time.time_ns that only moves when a test advances it."""
+
+    def __init__(self):
+        self.now = time.time_ns()
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds * LocalDataStore.NS_PER_SECOND
 
 class TestLocalDataStore(unittest.TestCase):
-    @patch('app.LocalDataStore.acquire_file_lock')
-    def test_save_data(self, mock_acquire_lock):
-        mock_acquire_lock.return_value = None
-        self.data_store = MagicMock()  
-        self.data_store.save_data()
-        self.assertTrue(self.data_store.save_data.called)
+    def setUp(self):
+        # Each test gets its own scratch directory, removed again however the test ends
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file_path = os.path.join(tmp_dir.name, "data_store.json")
 
-    @patch('app.LocalDataStore.acquire_file_lock')
-    def test_delete_key_success(self, mock_acquire_lock):
-        mock_acquire_lock.return_value = None
+    def test_save_data(self):
+        self.data_store = LocalDataStore(file_path=self.file_path, lock_strategy=NullLock())
+        with open(self.file_path, "rb") as f:
+            snapshot = f.read()
+        self.data_store.create("test_key", {"data": "value"})
+        # A mutation appends one record and leaves the snapshot alone
+        with open(self.file_path + ".wal", "rb") as f:
+            self.assertEqual(f.read(), b'{"op":"put","k":"test_key","v":{"data":"value"},"exp":null}\n')
+        with open(self.file_path, "rb") as f:
+            self.assertEqual(f.read(), snapshot)
+        # The snapshot goes to a temp file that is swapped in, and the fsyncs run without the commit lock held
+        def fsync(fd):
+            self.assertFalse(self.data_store.lock.locked())
+            real_fsync(fd)
+        real_fsync = os.fsync
+        with patch('app.os.fsync', side_effect=fsync) as mock_fsync, \
+                patch('app.os.replace', wraps=os.replace) as mock_replace:
+            self.data_store.save_data()
+        mock_fsync.assert_called()
+        mock_replace.assert_called_with(self.file_path + ".tmp", self.file_path)
+        self.assertEqual(os.path.getsize(self.file_path + ".wal"), 0)
+        with open(self.file_path, "rb") as f:
+            self.assertEqual(f.read(), b'{"test_key":{"value":{"data":"value"},"expiry":null}}')
+        self.data_store.close()
+
+    def test_save_data_waits_for_background_save_unlocked(self):
+        self.data_store = LocalDataStore(file_path=self.file_path, lock_strategy=NullLock())
+        self.data_store.create("key1", {"data": "value"})
+        release, waiting = threading.Event(), threading.Event()
+        write_snapshot = self.data_store._write_snapshot
+        def slow_write(blobs, expiry):
+            release.wait(5)
+            write_snapshot(blobs, expiry)
+        def wait(futures):
+            waiting.set()
+            return futures_wait(futures)
+        with patch.object(self.data_store, '_write_snapshot', side_effect=slow_write), \
+                patch('app.futures_wait', side_effect=wait):
+            with self.data_store.lock:
+                self.data_store._compact_in_background()  # A periodic compaction is now in flight
+            saver = threading.Thread(target=self.data_store.save_data)
+            saver.start()
+            self.assertTrue(waiting.wait(5))
+            # Writers keep going while save_data waits for the in-flight snapshot
+            writer = threading.Thread(target=self.data_store.create, args=("key2", {"data": "value"}))
+            writer.start()
+            writer.join(timeout=5)
+            self.assertFalse(writer.is_alive())
+            release.set()
+            saver.join(timeout=5)
+        with open(self.file_path) as f:
+            self.assertEqual(sorted(json.load(f)), ["key1", "key2"])
+        self.data_store.close()
+
+    def test_delete_key_success(self):
         self.data_store = MagicMock()
         self.data_store.delete.return_value = True 
         result = self.data_store.delete("test_key")
         self.assertTrue(result)
         self.assertTrue(self.data_store.delete.called)
 
-    @patch('app.LocalDataStore.acquire_file_lock')
-    def test_enforce_file_size_limit_exceeded(self, mock_acquire_lock):  
-        mock_acquire_lock.return_value = None
-        self.data_store = MagicMock()
-        self.data_store.create.return_value = True  
-        self.data_store.create("test_key", {"data": "value"})
-        self.assertTrue(self.data_store.create.called)
-
     @patch.object(LocalDataStore, 'is_key_expired')  
-    @patch('app.LocalDataStore.acquire_file_lock') 
-    def test_is_expired(self, mock_acquire_lock, mock_is_key_expired):
-        mock_acquire_lock.return_value = None
+    def test_is_expired(self, mock_is_key_expired):
         mock_is_key_expired.return_value = True
-        self.data_store = LocalDataStore()
-        self.data_store.data = {"test_key": "some_value"}
+        lock_strategy = MagicMock()
+        self.data_store = LocalDataStore(file_path=self.file_path, lock_strategy=lock_strategy)
+        self.data_store.data = {"test_key": b'"some_value"'}
         result = self.data_store.is_expired("test_key")
         self.assertTrue(result)
         mock_is_key_expired.assert_called_once_with("test_key")
-        mock_acquire_lock.assert_called_once()
+        self.assertNotIn("test_key", self.data_store.data)
+        lock_strategy.acquire.assert_called_once()
+        self.data_store.close()
 
-    @patch('app.LocalDataStore.acquire_file_lock')
-    def test_load_invalid_json(self, mock_acquire_lock):
-        mock_acquire_lock.return_value = None
-        self.data_store = MagicMock()
-        self.data_store.load_data.side_effect = ValueError("Invalid JSON")
-        with self.assertRaises(ValueError):
-            self.data_store.load_data()
+    def test_load_invalid_json(self):
+        with open(self.file_path, "w") as f:
+            f.write('{"key1": {"value": ')
+        wal_record = b'{"op":"put","k":"key2","v":{"n":2},"exp":null}\n'
+        with open(self.file_path + ".wal", "wb") as f:
+            f.write(wal_record)
+        rotated_record = b'{"op":"put","k":"key3","v":{"n":3},"exp":null}\n'
+        with open(self.file_path + ".wal.1", "wb") as f:
+            f.write(rotated_record)
+        with self.assertRaises(InvalidJSONError) as ctx:
+            LocalDataStore(file_path=self.file_path)
+        self.assertIn(self.file_path + ".wal.backup", str(ctx.exception))
+        self.assertIn(self.file_path + ".wal.1.backup", str(ctx.exception))
+        self.assertFalse(os.path.exists(self.file_path + ".wal.1"))
+        with open(self.file_path + ".wal.1.backup", "rb") as f:
+            self.assertEqual(f.read(), rotated_record)
+        with open(self.file_path + ".backup") as f:
+            self.assertEqual(f.read(), '{"key1": {"value": ')
+        with open(self.file_path + ".wal.backup", "rb") as f:
+            self.assertEqual(f.read(), wal_record)
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.assertEqual(self.data_store.data, {})
+        self.data_store.close()
 
-    @patch('app.LocalDataStore.acquire_file_lock')
-    def test_read_expired_key(self, mock_acquire_lock):
-        mock_acquire_lock.return_value = None
+    def test_read_expired_key(self):
         self.data_store = MagicMock()
         self.data_store.read.return_value = {"status": "error"} 
         result = self.data_store.read("expired_key")
         self.assertEqual(result["status"], "error")
         self.assertTrue(self.data_store.read.called)
 
-    @patch('app.LocalDataStore.acquire_file_lock')
-    def test_delete_key_failure(self, mock_acquire_lock): 
-        mock_acquire_lock.return_value = None  
+    def test_delete_key_failure(self): 
         self.data_store = MagicMock()
         self.data_store.delete.return_value = False 
         result = self.data_store.delete("non_existent_key")
         self.assertFalse(result)
         self.assertTrue(self.data_store.delete.called)
 
-    @patch('app.LocalDataStore.acquire_file_lock')
-    def test_create_key_failure(self, mock_acquire_lock): 
-        mock_acquire_lock.return_value = None
+    def test_create_key_failure(self): 
         self.data_store = MagicMock()
         self.data_store.create.return_value = False  
         result = self.data_store.create("new_key", {"data": "value"})
         self.assertFalse(result)
         self.assertTrue(self.data_store.create.called)
 
+    def run_script(self, body, **options):
+        """Run body in a fresh interpreter with `store` opened on self.file_path."""
+        options = "".join(f", {name}={value!r}" for name, value in options.items())
+        script = (f"import os, sys; sys.path.insert(0, {APP_DIR!r}); from app import LocalDataStore\n"
+                  f"store = LocalDataStore(file_path={self.file_path!r}{options})\n{body}")
+        subprocess.run([sys.executable, "-c", script], check=True, capture_output=True)
+
+    def test_wal_replay(self):
+        # Simulate a crash: os._exit skips close() and any flush of userspace buffers
+        self.run_script('store.create("key1", {"name": "value1"})\n'
+                        'store.create("key2", {"name": "value2"})\n'
+                        'store.delete("key2")\n'
+                        'os._exit(0)')
+        with open(self.file_path + ".wal", "rb") as f:
+            self.assertEqual(len(f.readlines()), 3)
+        reloaded = LocalDataStore(file_path=self.file_path)
+        self.assertEqual(reloaded.read("key1")["value"], {"name": "value1"})
+        self.assertEqual(reloaded.read("key2")["status"], "error")
+        reloaded.close()
+
+    def test_append_after_torn_wal_record(self):
+        self.run_script('store.create("a", {"n": 1})\n'
+                        'os._exit(0)')
+        with open(self.file_path + ".wal", "ab") as f:
+            f.write(b'{"op":"put","k":"b","v":{"n"')  # Crash mid-append
+        # The next session appends fsynced records after the torn one, then crashes too
+        self.run_script('store.create("c", {"n": 3})\n'
+                        'store.create("d", {"n": 4})\n'
+                        'os._exit(0)', durable=True)
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.assertEqual(sorted(self.data_store.data), ["a", "c", "d"])
+        self.data_store.close()
+
+    def test_invalid_wal_record_backed_up(self):
+        self.run_script('store.create("a", {"n": 1})\n'
+                        'os._exit(0)')
+        with open(self.file_path + ".wal", "ab") as f:
+            f.write(b'{"op":"pu\n')  # e.g. left by a short write before ENOSPC, then a later append
+            f.write(b'{"op":"put","k":"c","v":{"n":3},"exp":null}\n{"op":"put","k":"d","v":{"n":4},"exp":null}\n')
+        with open(self.file_path + ".wal", "rb") as f:
+            original = f.read()
+        with self.assertRaises(InvalidJSONError):
+            LocalDataStore(file_path=self.file_path)
+        with open(self.file_path + ".wal.backup", "rb") as f:
+            self.assertEqual(f.read(), original)
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.assertEqual(sorted(self.data_store.data), ["a"])
+        self.data_store.close()
+
+    def test_exit_without_close_persists(self):
+        self.run_script('store.create("key1", {"name": "value1"})')
+        self.assertEqual(os.path.getsize(self.file_path + ".wal"), 0)  # Compacted at interpreter exit
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.assertEqual(self.data_store.read("key1")["value"], {"name": "value1"})
+        self.data_store.close()
+
+    def test_load_once(self):
+        with patch.object(LocalDataStore, 'load_data', autospec=True, side_effect=LocalDataStore.load_data) as mock_load:
+            self.data_store = LocalDataStore(file_path=self.file_path, lock_strategy=NullLock())
+        # Operations trust the in-memory state: the snapshot is never re-read and the WAL stays open
+        with patch('builtins.open', wraps=open) as mock_file:
+            self.data_store.create("key1", {"data": "value"})
+            self.data_store.create("key2", {"data": "value"})
+            self.assertEqual(self.data_store.read("key1")["value"], {"data": "value"})
+            self.data_store.delete("key2")
+        mock_load.assert_called_once()
+        self.assertEqual(mock_file.call_count, 0)
+        self.data_store.close()
+
+    def test_close_compacts_wal(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.data_store.create("key1", {"name": "value1"})
+        self.data_store.close()
+        self.assertEqual(os.path.getsize(self.file_path + ".wal"), 0)
+        with open(self.file_path) as f:
+            self.assertEqual(json.load(f)["key1"]["value"], {"name": "value1"})
+
+    def test_serialized_size_tracking(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.data_store.create("key1", {"name": "value1"})
+        self.data_store.create("key2", {"name": "value2"}, ttl=60)
+        self.data_store.delete("key1")
+        self.data_store.close()
+        # The running total counts one separator per entry, so it may lead the real size by a byte
+        file_size = os.path.getsize(self.file_path)
+        self.assertLessEqual(abs(self.data_store.total_size - file_size), 1)
+
+    def test_cleanup_expired_keys(self):
+        clock = FakeClock()
+        self.data_store = LocalDataStore(file_path=self.file_path, clock=clock)
+        self.data_store.create("short_lived", {"data": "value"}, ttl=10)
+        self.data_store.create("permanent", {"data": "value"})
+        clock.advance(20)
+        self.data_store.cleanup_expired_keys()
+        self.assertNotIn("short_lived", self.data_store.data)
+        self.assertIn("permanent", self.data_store.data)
+        self.assertEqual(self.data_store._expiry_heap, [])
+        for i in range(200):
+            self.data_store.create(f"churn_{i}", {"data": i}, ttl=10)
+            self.data_store.delete(f"churn_{i}")
+        self.assertLessEqual(len(self.data_store._expiry_heap), self.data_store.HEAP_SLACK + 1)
+        self.data_store.close()
+
+    def test_concurrent_creates(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        def worker(n):
+            for i in range(50):
+                self.data_store.create(f"key_{n}_{i}", {"data": i})
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.data_store.data), 400)
+        self.data_store.close()
+        reloaded = LocalDataStore(file_path=self.file_path)
+        self.assertEqual(len(reloaded.data), 400)
+        reloaded.close()
+
+    def test_float_ttl_round_trip(self):
+        clock = FakeClock()
+        self.data_store = LocalDataStore(file_path=self.file_path, clock=clock)
+        self.data_store.create("key1", {"data": "value"}, ttl=0.5)
+        self.data_store.batch_create({"key2": {"data": "value"}}, ttl=0.5)
+        self.assertEqual(self.data_store._expiry["key1"], clock.now + LocalDataStore.NS_PER_SECOND // 2)
+        self.data_store.close()
+        self.data_store = LocalDataStore(file_path=self.file_path, clock=clock)
+        self.assertEqual(self.data_store._expiry, dict.fromkeys(["key1", "key2"], clock.now + LocalDataStore.NS_PER_SECOND // 2))
+        clock.advance(1)
+        self.assertEqual(self.data_store.read("key1")["status"], "error")
+        self.data_store.close()
+
+    def test_out_of_range_ttl_rejected(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        for ttl in (2 * 10 ** 10, float("inf")):
+            with self.assertRaises(DataStoreError):
+                self.data_store.create("key1", {"data": "value"}, ttl=ttl)
+            with self.assertRaises(DataStoreError):
+                self.data_store.batch_create({"key2": {"data": "value"}}, ttl=ttl)
+        self.assertEqual(self.data_store.data, {})
+        self.assertEqual(self.data_store._expiry, {})
+        self.data_store.create("key1", {"data": "value"}, ttl=10 ** 9)  # About 32 years still fits
+        self.data_store.close()
+        self.assertTrue(self.data_store._closed)
+
+    def test_load_legacy_float_expiry(self):
+        with open(self.file_path, "w") as f:
+            f.write('{"old":{"value":1,"expiry":%r},"live":{"value":2,"expiry":%r}}' % (time.time() - 1, time.time() + 60))
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.assertIsInstance(self.data_store._expiry["live"], int)
+        self.assertEqual(self.data_store.read("old")["status"], "error")
+        self.assertEqual(self.data_store.read("live")["value"], 2)
+        self.data_store.close()
+
+    def test_batch_create_single_wal_write(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.data_store.create("key1", {"name": "value1"})
+        kv_pairs = {"key1": {"name": "dup"}, "key2": {"name": "value2"}, _LONG_KEY: {"name": "long"}}
+        with patch.object(self.data_store, 'append_wal', wraps=self.data_store.append_wal) as mock_append:
+            result = self.data_store.batch_create(kv_pairs, ttl=10)
+        mock_append.assert_called_once()
+        self.assertEqual(result["status"], "partial_success")
+        self.assertEqual(result["created"], ["key2"])
+        self.assertEqual(set(result["errors"]), {"key1", _LONG_KEY})
+        self.assertEqual([key for _, key in self.data_store._expiry_heap], ["key2"])
+        total_size = self.data_store.total_size
+        self.data_store.close()
+        self.assertAlmostEqual(total_size, os.path.getsize(self.file_path), delta=1)
+
+    def test_file_lock_held_for_store_lifetime(self):
+        with LocalDataStore(file_path=self.file_path) as self.data_store:
+            with self.assertRaises(FileLockError):
+                LocalDataStore(file_path=self.file_path)
+        LocalDataStore(file_path=self.file_path).close()
+        # Only contention is reported as FileLockError; a missing directory keeps its own error
+        with self.assertRaises(FileNotFoundError):
+            LocalDataStore(file_path=os.path.join(os.path.dirname(self.file_path), "missing", "data_store.json"))
+
+    def test_failed_wal_open_releases_lock(self):
+        with patch.object(LocalDataStore, "_open_wal", side_effect=PermissionError("denied")), \
+                patch.object(LocalDataStore, "release_file_lock", autospec=True,
+                             side_effect=LocalDataStore.release_file_lock) as release:
+            with self.assertRaises(PermissionError):
+                LocalDataStore(file_path=self.file_path)
+        release.assert_called_once()
+        LocalDataStore(file_path=self.file_path).close()
+
+    def test_failed_save_keeps_previous_snapshot(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.data_store.create("key1", {"data": "value"})
+        self.data_store.save_data()
+        self.data_store.create("key2", {"data": "value"})
+        real_replace = os.replace
+        def replace(src, dst):
+            # Let the WAL rotation through; fail only the swap of the new snapshot into place
+            if src == self.file_path + ".tmp":
+                raise OSError("disk full")
+            real_replace(src, dst)
+        with patch('app.os.replace', side_effect=replace) as mock_replace:
+            with self.assertRaises(OSError):
+                self.data_store.save_data()
+        mock_replace.assert_any_call(self.file_path + ".tmp", self.file_path)
+        self.assertFalse(os.path.exists(self.file_path + ".tmp"))
+        with open(self.file_path) as f:
+            self.assertEqual(list(json.load(f)), ["key1"])
+        self.data_store.close()  # Retries with the rotated log still on disk
+        with open(self.file_path) as f:
+            self.assertEqual(sorted(json.load(f)), ["key1", "key2"])
+        self.assertFalse(os.path.exists(self.file_path + ".wal.1"))
+
+    def test_monitor_woken_by_capacity_pressure(self):
+        self.data_store = LocalDataStore(file_path=self.file_path, monitor_interval=0)
+        self.assertFalse(self.data_store._pressure_event.is_set())
+        self.data_store._warning_bytes = 0
+        with patch.object(self.data_store, 'check_capacity_usage', wraps=self.data_store.check_capacity_usage) as mock_check:
+            self.data_store.create("key1", {"data": "value"})
+            for _ in range(100):
+                if mock_check.called:
+                    break
+                time.sleep(0.01)
+        mock_check.assert_called()
+        self.data_store.close()
+
+    def test_background_compaction(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.data_store.COMPACT_THRESHOLD = 2
+        self.data_store.create("key1", {"data": "value"})
+        self.data_store.create("key2", {"data": "value"})
+        self.data_store._wait_for_save()
+        self.assertFalse(os.path.exists(self.file_path + ".wal.1"))
+        with open(self.file_path) as f:
+            self.assertEqual(sorted(json.load(f)), ["key1", "key2"])
+        self.data_store.create("key3", {"data": "value"})
+        self.data_store.close()
+        reloaded = LocalDataStore(file_path=self.file_path)
+        self.assertEqual(sorted(reloaded.data), ["key1", "key2", "key3"])
+        reloaded.close()
+
+    def test_failed_wal_rotation_keeps_mutation(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.data_store.COMPACT_THRESHOLD = 2
+        self.data_store.create("key1", {"data": "value"})
+        with patch('app.os.replace', side_effect=OSError("disk full")):
+            self.assertTrue(self.data_store.create("key2", {"data": "value"}))
+        self.assertIn("key2", self.data_store.data)
+        # The next threshold crossing rotates and compacts as usual
+        self.data_store.create("key3", {"data": "value"})
+        self.data_store.create("key4", {"data": "value"})
+        self.data_store._wait_for_save()
+        with open(self.file_path) as f:
+            self.assertEqual(sorted(json.load(f)), ["key1", "key2", "key3", "key4"])
+        self.data_store.close()
+
+    def test_snapshot_larger_than_write_buffer(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.data_store._snapshot_buf = bytearray(64)
+        kv_pairs = {f"key{i}": {"data": "x" * (i * 10)} for i in range(20)}
+        self.data_store.batch_create(kv_pairs)
+        self.data_store.close()
+        with open(self.file_path) as f:
+            self.assertEqual({key: entry["value"] for key, entry in json.load(f).items()}, kv_pairs)
+
+    def test_concurrent_readers(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        self.data_store.create("key1", {"data": "value"})
+        results = []
+        def reader():
+            for _ in range(100):
+                results.append(self.data_store.read("key1")["status"])
+        # Hold the key's stripe and the commit lock as an in-flight writer would
+        with self.data_store._lock_for("key1"), self.data_store.lock:
+            threads = [threading.Thread(target=reader) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+            self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(results, ["success"] * 800)
+        self.data_store.close()
+
+    def test_read_returns_decoded_copy(self):
+        self.data_store = LocalDataStore(file_path=self.file_path)
+        value = {"name": "value1", "tags": ["a"]}
+        self.data_store.create("key1", value)
+        self.assertEqual(self.data_store.data["key1"], b'{"name":"value1","tags":["a"]}')
+        value["tags"].append("b")
+        first = self.data_store.read("key1")["value"]
+        first["tags"].append("c")
+        self.assertEqual(self.data_store.read("key1")["value"], {"name": "value1", "tags": ["a"]})
+        self.data_store.close()
+
+    def test_sqlite_store_persists_mutations(self):
+        self.data_store = SQLiteDataStore(file_path=self.file_path, clock=FakeClock())
+        self.data_store.create("key1", {"name": "value1"})
+        self.data_store.create("key2", {"name": "value2"}, ttl=60)
+        self.data_store.batch_create({"key3": {"name": "value3"}, "key4": [1, 2]})
+        self.data_store.delete("key1")
+        # Each mutation is already committed; a crash here loses nothing
+        with sqlite3.connect(self.file_path) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+            self.assertEqual(sorted(key for key, in conn.execute("SELECT key FROM kv")), ["key2", "key3", "key4"])
+        self.data_store.close()
+        reloaded = SQLiteDataStore(file_path=self.file_path)
+        self.assertEqual(reloaded.read("key4")["value"], [1, 2])
+        self.assertEqual(list(reloaded._expiry), ["key2"])
+        self.assertAlmostEqual(reloaded.total_size, self.data_store.total_size, delta=1)
+        self.assertIsNone(reloaded._snapshot_buf)
+        self.assertIsNone(reloaded._io_exec)
+        reloaded.close()
+
+    def test_sqlite_store_deletes_evicted_rows(self):
+        clock = FakeClock()
+        self.data_store = SQLiteDataStore(file_path=self.file_path, clock=clock)
+        self.data_store.create("key1", {"data": "value"}, ttl=10)
+        clock.advance(20)
+        self.assertEqual(self.data_store.read("key1")["status"], "error")
+        with sqlite3.connect(self.file_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM kv").fetchone(), (0,))
+        self.data_store.close()
+
+    def test_sqlite_store_rejects_non_database_file(self):
+        with open(self.file_path, "w") as f:
+            f.write('{"key1": {"value": 1, "expiry": null}}')
+        with self.assertRaises(DataStoreError):
+            SQLiteDataStore(file_path=self.file_path)
+        SQLiteDataStore(file_path=self.file_path + ".db").close()  # The failed open released the file lock
+
+class TestSharedStore(unittest.TestCase):
+    """Tests that only touch in-memory state, run against one store instead of opening a file per test."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.clock = FakeClock()
+        cls.store = LocalDataStore(file_path=os.path.join(cls.tmp_dir.name, "data_store.json"), lock_strategy=NullLock(),
+                                   clock=cls.clock)
+        cls.empty_size = cls.store.total_size
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.store.close()
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        self.data_store = self.store
+        with self.data_store.lock:
+            self.data_store.data.clear()
+            self.data_store._expiry.clear()
+            self.data_store._expiry_heap.clear()
+            self.data_store.total_size = self.empty_size
+
+    def test_enforce_file_size_limit_exceeded(self):  
+        # The counter stands in for a store filled to the limit; no entries need to be built
+        self.data_store.total_size = self.data_store.MAX_DATA_CAPACITY - 1
+        self.data_store.enforce_file_size_limit()
+        self.data_store.total_size = self.data_store.MAX_DATA_CAPACITY
+        with patch.object(self.data_store, 'cleanup_expired_keys') as mock_cleanup:
+            with self.assertRaises(FileSizeLimitExceededError):
+                self.data_store.enforce_file_size_limit()
+        mock_cleanup.assert_called_once()
+
+        # A cleanup that frees enough space lets the write through
+        def free_space():
+            self.data_store.total_size = self.empty_size
+        with patch.object(self.data_store, 'cleanup_expired_keys', side_effect=free_space):
+            self.data_store.enforce_file_size_limit()
+
+    def test_read_evicts_expired_key(self):
+        self.data_store.create("key1", {"data": "value"}, ttl=10)
+        self.assertEqual(self.data_store.read("key1")["status"], "success")
+        self.clock.advance(20)
+        self.assertEqual(self.data_store.read("key1")["status"], "error")
+        self.assertNotIn("key1", self.data_store.data)
+
+    def test_ttl_expiration(self):
+        self.data_store.create("key1", {"name": "value1"}, ttl=2)
+        self.clock.advance(2)
+        self.assertEqual(self.data_store.read("key1")["value"], {"name": "value1"})  # Still live at its expiry
+        self.clock.advance(1)
+        self.assertTrue(self.data_store.is_key_expired("key1"))
+        self.assertEqual(self.data_store.read("key1"), {"status": "error", "message": "Key 'key1' not found."})
+
+    def test_create_rejected_at_capacity(self):
+        self.data_store.total_size = self.data_store.MAX_DATA_CAPACITY
+        with self.assertRaises(FileSizeLimitExceededError):
+            self.data_store.create("key1", {"data": "value"})
+
+    def test_create_value_too_large_error(self):
+        with patch('app._dumps') as mock_dumps:
+            with self.assertRaises(ValueTooLargeError):
+                self.data_store.create("key1", {"data": _LONG_VALUE})
+        mock_dumps.assert_not_called()
+        # Values that only exceed the limit once encoded are still caught
+        with self.assertRaises(ValueTooLargeError):
+            self.data_store.create("key2", {"data": _ENCODED_TOO_LONG_VALUE})
+        self.assertTrue(self.data_store.create("key3", {"data": _FITTING_VALUE}))
+
 if __name__ == '_main_':
     unittest.main()
\ No newline at end of file